@@ -1,34 +1,50 @@
 from fastapi import FastAPI, Depends, HTTPException, status
 from fastapi.middleware.cors import CORSMiddleware
+from cors import cors_origins
+from fastapi.responses import ORJSONResponse
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from jose import JWTError, jwt
+import jwt
+from jwt import InvalidTokenError
 from datetime import datetime, timedelta
 from typing import Optional
 from pydantic import BaseModel, EmailStr
-import firebase_admin
-from firebase_admin import credentials, firestore
+from google.api_core.exceptions import AlreadyExists
 from passlib.context import CryptContext
+from cryptography.hazmat.primitives.serialization import load_pem_private_key
+from cachetools import TTLCache
+import asyncio
+import hashlib
+import time
 import os
 from dotenv import load_dotenv
 load_dotenv()
 
-# Initialize Firebase
-cred = credentials.Certificate(os.getenv("CRED_PATH"))
-firebase_admin.initialize_app(cred)
-db = firestore.client()
+# Firebase is initialized once in firebase_client
+from firebase_client import db
 
-# JWT Configuration
-SECRET_KEY = os.getenv("SECRET_KEY") 
-ALGORITHM = "HS256"
+# JWT Configuration - tokens are signed with an Ed25519 key and verified with its public half;
+# both key objects are loaded once rather than parsed on every sign/verify
+with open(os.environ["JWT_PRIVATE_KEY_PATH"], "rb") as key_file:
+    PRIVATE_KEY = load_pem_private_key(key_file.read(), password=None)
+PUBLIC_KEY = PRIVATE_KEY.public_key()
+ALGORITHM = "EdDSA"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+TOKEN_VERSION = 1  # Bump when the claims carried in access tokens change
 
-app = FastAPI()
+# Short-lived in-process caches for the authentication hot paths
+AUTH_CACHE_TTL_SECONDS = 5
+token_cache = TTLCache(maxsize=10_000, ttl=AUTH_CACHE_TTL_SECONDS)  # token -> (user, expires_at)
+login_cache = TTLCache(maxsize=10_000, ttl=AUTH_CACHE_TTL_SECONDS)  # verified credentials
+# Per-process secret for the cache keys, so keys derived from passwords can't be
+# brute-forced at hash speed from a memory dump
+_CACHE_SECRET = os.urandom(32)
+
+app = FastAPI(default_response_class=ORJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
+    **cors_origins(),  # Origins and credentials from CORS_ORIGINS
+    allow_methods=["GET", "POST", "PUT", "DELETE"],
     allow_headers=["*"],
 )
 
@@ -73,56 +89,93 @@ class Token(BaseModel):
 
 class TokenData(BaseModel):
     email: Optional[str] = None
+    id: Optional[str] = None
+    disabled: bool = False
+
+# Password Utilities - bcrypt is CPU-bound, so run it off the event loop
+async def verify_password(plain_password, hashed_password):
+    return await asyncio.to_thread(pwd_context.verify, plain_password, hashed_password)
 
-# Password Utilities remain the same
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+async def get_password_hash(password):
+    return await asyncio.to_thread(pwd_context.hash, password)
 
-def get_password_hash(password):
-    return pwd_context.hash(password)
+def cache_key(*parts: str) -> bytes:
+    return hashlib.blake2b("\0".join(parts).encode(), digest_size=16, key=_CACHE_SECRET).digest()
+
+def email_key(email: str) -> str:
+    # User documents are keyed by their email so lookups are a single keyed read
+    return hashlib.sha256(email.lower().encode()).hexdigest()
 
 # Updated Database Operations
 async def get_user_by_email(email: str) -> Optional[UserInDB]:
     users_ref = db.collection('users')
-    query = users_ref.where('email', '==', email).limit(1)
-    users = query.get()
-    
-    for user in users:
-        user_data = user.to_dict()
-        user_data['id'] = user.id
-        return UserInDB(**user_data)
+    user_doc = await users_ref.document(email_key(email)).get()
+    if user_doc.exists:
+        user_data = user_doc.to_dict()
+        # The key is only a hint: an account keeps its document after changing its email
+        if user_data['email'].lower() == email.lower():
+            user_data['id'] = user_doc.id
+            return UserInDB(**user_data)
+    return await query_user_by_email(email)
+
+async def query_user_by_email(email: str) -> Optional[UserInDB]:
+    # Accounts created before documents were keyed by email, or whose email
+    # has changed since signup, can only be found with a query. Accounts store a
+    # lowercased copy of their email so the match ignores case like the key does;
+    # older ones only have the email as entered, so fall back to an exact match
+    users_ref = db.collection('users')
+    for field, value in (('email_lower', email.lower()), ('email', email)):
+        users = await users_ref.where(field, '==', value).limit(1).get()
+        for user in users:
+            user_data = user.to_dict()
+            user_data['id'] = user.id
+            return UserInDB(**user_data)
     return None
 
 async def create_user_in_db(user: UserCreate) -> UserInDB:
     users_ref = db.collection('users')
     
-    # Check if user already exists
-    if await get_user_by_email(user.email):
-        raise HTTPException(
-            status_code=400,
-            detail="Email already registered"
-        )
+    email_taken = HTTPException(
+        status_code=400,
+        detail="Email already registered"
+    )
+
+    # Keyed accounts are checked atomically by create() below
+    if await query_user_by_email(user.email):
+        raise email_taken
     
     # Create user document with new fields
     user_data = {
         "email": user.email,
+        "email_lower": user.email.lower(),
         "full_name": user.full_name,
         "profile_pic_url": user.profile_pic_url,
         "job_role": user.job_role,
         "company_name": user.company_name,
         "location": user.location,
-        "hashed_password": get_password_hash(user.password),
+        "hashed_password": await get_password_hash(user.password),
         "disabled": False,
         "created_at": datetime.utcnow()
     }
     
-    # Add to Firestore
-    doc_ref = users_ref.add(user_data)
-    user_data['id'] = doc_ref[1].id
+    # Add to Firestore under the email-derived key; create() fails if the
+    # document already exists, so concurrent signups cannot both succeed
+    doc_ref = users_ref.document(email_key(user.email))
+    try:
+        await doc_ref.create(user_data)
+    except AlreadyExists:
+        # The keyed document may belong to an account that has since changed its
+        # email; the address is free again, so store this account under a new id
+        holder = (await doc_ref.get()).to_dict()
+        if holder is not None and holder['email'].lower() == user.email.lower():
+            raise email_taken
+        doc_ref = users_ref.document()
+        await doc_ref.create(user_data)
+    user_data['id'] = doc_ref.id
     
     return UserInDB(**user_data)
 
-# JWT Functions remain mostly the same
+# Access tokens are signed with the Ed25519 private key
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -131,40 +184,53 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
         expire = datetime.utcnow() + timedelta(minutes=15)
     
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    encoded_jwt = jwt.encode(to_encode, PRIVATE_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
 async def authenticate_user(email: str, password: str):
     user = await get_user_by_email(email)
     if not user:
         return False
-    if not verify_password(password, user.hashed_password):
-        return False
+    # Skip bcrypt for credentials that were verified moments ago
+    key = cache_key(email, password, user.hashed_password)
+    if key not in login_cache:
+        if not await verify_password(password, user.hashed_password):
+            return False
+        login_cache[key] = True
     return user
 
-# Current user functions remain the same
+# Resolve the current user from the claims of a verified access token
 async def get_current_user(token: str = Depends(oauth2_scheme)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    
+
+    key = cache_key(token)
+    cached = token_cache.get(key)
+    if cached is not None:
+        user, expires_at = cached
+        if time.time() < expires_at:
+            return user
+
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = jwt.decode(token, PUBLIC_KEY, algorithms=[ALGORITHM])
         email: str = payload.get("sub")
         if email is None:
             raise credentials_exception
-        token_data = TokenData(email=email)
-    except JWTError:
+    except InvalidTokenError:
         raise credentials_exception
 
-    user = await get_user_by_email(token_data.email)
-    if user is None:
+    # Every token signed with the current key carries the claims needed to authorize the request
+    if payload.get("v") != TOKEN_VERSION:
         raise credentials_exception
+    user = TokenData(email=email, id=payload["uid"], disabled=payload["disabled"])
+    # Never serve a cached user past the token's own expiry
+    token_cache[key] = (user, min(payload["exp"], time.time() + AUTH_CACHE_TTL_SECONDS))
     return user
 
-async def get_current_active_user(current_user: User = Depends(get_current_user)):
+async def get_current_active_user(current_user: TokenData = Depends(get_current_user)):
     if current_user.disabled:
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
@@ -193,7 +259,8 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends()):
     
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": user.email}, expires_delta=access_token_expires
+        data={"sub": user.email, "uid": user.id, "disabled": user.disabled, "v": TOKEN_VERSION},
+        expires_delta=access_token_expires
     )
     
     # Return flat structure
@@ -212,31 +279,47 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends()):
     }
 
 @app.get("/users/me", response_model=User)
-async def read_users_me(current_user: User = Depends(get_current_active_user)):
-    return current_user
+async def read_users_me(current_user: TokenData = Depends(get_current_active_user)):
+    user_doc = await db.collection('users').document(current_user.id).get()
+    if not user_doc.exists:
+        raise HTTPException(status_code=404, detail="User not found")
+    user_data = user_doc.to_dict()
+    user_data['id'] = user_doc.id
+    return User(**user_data)
 
 @app.put("/users/me", response_model=User)
 async def update_user(
     updated_user: UserBase,
-    current_user: User = Depends(get_current_active_user)
+    current_user: TokenData = Depends(get_current_active_user),
+    token: str = Depends(oauth2_scheme)
 ):
     try:
+        # Don't let the account take over an email another account already uses
+        if updated_user.email.lower() != current_user.email.lower():
+            existing = await get_user_by_email(updated_user.email)
+            if existing and existing.id != current_user.id:
+                raise HTTPException(status_code=400, detail="Email already registered")
+
         user_ref = db.collection('users').document(current_user.id)
         update_data = {
             "full_name": updated_user.full_name,
             "email": updated_user.email,
+            "email_lower": updated_user.email.lower(),
             "profile_pic_url": updated_user.profile_pic_url,
             "job_role": updated_user.job_role,
             "company_name": updated_user.company_name,
             "location": updated_user.location
         }
-        user_ref.update(update_data)
+        await user_ref.update(update_data)
+        token_cache.pop(cache_key(token), None)
         
         # Get updated user data
-        updated_data = user_ref.get().to_dict()
+        updated_data = (await user_ref.get()).to_dict()
         updated_data['id'] = current_user.id
         return User(**updated_data)
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=400,
@@ -244,9 +327,13 @@ async def update_user(
         )
 
 @app.delete("/users/me")
-async def delete_user(current_user: User = Depends(get_current_active_user)):
+async def delete_user(
+    current_user: TokenData = Depends(get_current_active_user),
+    token: str = Depends(oauth2_scheme)
+):
     try:
-        db.collection('users').document(current_user.id).delete()
+        await db.collection('users').document(current_user.id).delete()
+        token_cache.pop(cache_key(token), None)
         return {"message": "User deleted successfully"}
     except Exception as e:
         raise HTTPException(
@@ -1,6 +1,13 @@
-# Generate a secure key in production
-import secrets
-secret_key = secrets.token_urlsafe(32)
+# Generate an Ed25519 signing key for JWTs in production:
+#   python test.py > jwt_private_key.pem
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
 
-print(secret_key)
+private_key = Ed25519PrivateKey.generate()
+pem = private_key.private_bytes(
+    encoding=serialization.Encoding.PEM,
+    format=serialization.PrivateFormat.PKCS8,
+    encryption_algorithm=serialization.NoEncryption(),
+)
 
+print(pem.decode(), end="")
@@ -0,0 +1,8 @@
+# CORS origin settings shared by the service's apps
+import os
+
+# Frontend origins come from the comma-separated CORS_ORIGINS; credentials are only allowed
+# for an explicit list, otherwise any origin may call the API but without credentials
+def cors_origins():
+    origins = [origin.strip() for origin in os.getenv("CORS_ORIGINS", "").split(",") if origin.strip()]
+    return {"allow_origins": origins or ["*"], "allow_credentials": bool(origins)}
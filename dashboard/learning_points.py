@@ -1,24 +1,19 @@
 from fastapi import FastAPI, HTTPException,Query
-import firebase_admin
-from firebase_admin import credentials, firestore
-import os
 from fastapi.middleware.cors import CORSMiddleware
+from cors import cors_origins
 from google.api_core.exceptions import GoogleAPICallError
 
 app = FastAPI()
 
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
+    **cors_origins(),  # Origins and credentials from CORS_ORIGINS
+    allow_methods=["GET", "POST", "PUT", "DELETE"],
     allow_headers=["*"],
 )
 
-# Initialize Firebase
-cred = credentials.Certificate(os.getenv("CRED_PATH"))
-firebase_admin.initialize_app(cred)
-db = firestore.client()
+# Firebase is initialized once in firebase_client
+from firebase_client import db
 
 @app.get("/learning_points/")
 async def get_latest_feedback(user_id: str):
@@ -1,36 +1,53 @@
 from fastapi import FastAPI, HTTPException, Query
-import firebase_admin
-from firebase_admin import credentials, firestore
-import openai  # Use OpenAI API (replace with your LLM API)
+from fastapi.responses import ORJSONResponse
+from firebase_admin import firestore
+from openai import AsyncOpenAI  # Use OpenAI API (replace with your LLM API)
+import httpx
 from google.api_core.exceptions import GoogleAPICallError
 from fastapi.middleware.cors import CORSMiddleware
+from cors import cors_origins
+from cachetools import TTLCache
+from pydantic import BaseModel
+from typing import List
+import hashlib
 import os
-import json
+import orjson
 # from dotenv import load_dotenv
 # load_dotenv()
 from dotenv import load_dotenv
 load_dotenv()
-app = FastAPI()
+app = FastAPI(default_response_class=ORJSONResponse)
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
+    **cors_origins(),  # Origins and credentials from CORS_ORIGINS
+    allow_methods=["GET", "POST", "PUT", "DELETE"],
     allow_headers=["*"],
 )
 
 
-# Initialize Firebase
-cred = credentials.Certificate(os.getenv("CRED_PATH"))
-firebase_admin.initialize_app(cred)
-db = firestore.client()
+# Firebase is initialized once in firebase_client
+from firebase_client import async_db as db
 
 
 
-# OpenAI API Key (Replace with your API)
-openai.api_key = os.getenv("OPENAI_API_KEY")
+# OpenAI client (Replace with your API), shared so connections are kept alive across requests
+client = AsyncOpenAI(
+    api_key=os.getenv("OPENAI_API_KEY"),
+    http_client=httpx.AsyncClient(limits=httpx.Limits(max_connections=100, max_keepalive_connections=20)),
+)
+# Summaries keyed by a digest of the feedback they were generated from
+summary_cache = TTLCache(maxsize=10_000, ttl=600)
+
+# Shape of the JSON the LLM is asked to return
+class SummaryTips(BaseModel):
+    positive_tips: List[str]
+    improvement_tips: List[str]
+
+class FeedbackSummary(BaseModel):
+    summary: SummaryTips
+
 # LLM Prompt for Feedback Summary
-def generate_feedback_summary(feedback_list):
+async def generate_feedback_summary(feedback_list):
     prompt = (
         "Here is a collection of feedback from a user's sales conversation:\n\n"
         + "\n".join(f"- {f['short_feedback']}: {f['long_feedback']}" for f in feedback_list)
@@ -48,14 +65,16 @@ def generate_feedback_summary(feedback_list):
         """
     )
 
-    response = openai.ChatCompletion.create(
-        model="gpt-4",  # Use GPT-4 or another LLM
+    response = await client.chat.completions.create(
+        model="gpt-4o-mini",
         messages=[{"role": "system", "content": "You are an AI assistant skilled in analyzing sales feedback."},
                   {"role": "user", "content": prompt}],
-        temperature=0.7,
+        temperature=0,
+        max_tokens=200,  # Six short tips fit well within this
+        response_format={"type": "json_object"},
     )
 
-    return response["choices"][0]["message"]["content"]
+    return FeedbackSummary.model_validate_json(response.choices[0].message.content)
 
 
 @app.get("/feedback_summary/")
@@ -63,28 +82,42 @@ async def get_feedback_summary(user_id: str):
     try:
         feedback_ref = db.collection("feedback")
 
-        # Fetch all feedback for the user_id
-        query = feedback_ref.where("user_id", "==", user_id)
-        results = [doc.to_dict() for doc in query.stream()]
+        # Fetch only the 5 most recent feedback entries for the user_id
+        # (served by the user_id/timestamp composite index in firestore.indexes.json)
+        query = (
+            feedback_ref.where("user_id", "==", user_id)
+            .order_by("timestamp", direction=firestore.Query.DESCENDING)
+            .limit(5)
+        )
+        results = [doc.to_dict() async for doc in query.stream()]
 
         if not results:
             raise HTTPException(status_code=404, detail="No feedback found for the given user_id")
 
-        # Sort results by timestamp in descending order and get the 5 most recent entries
-        sorted_results = sorted(results, key=lambda x: x.get('timestamp', 0), reverse=True)[:5]
-
         # Collect feedback data from the 5 most recent entries
         all_feedback = []
-        for feedback_entry in sorted_results:
+        for feedback_entry in results:
             if "feedback" in feedback_entry:
                 all_feedback.extend(feedback_entry["feedback"])
 
         if not all_feedback:
             raise HTTPException(status_code=404, detail="No valid feedback found for the given user_id")
 
+        # Reuse the summary if the recent feedback has not changed
+        key = hashlib.blake2b(
+            orjson.dumps(
+                all_feedback,
+                option=orjson.OPT_SORT_KEYS | orjson.OPT_PASSTHROUGH_DATETIME,
+                default=str,
+            ),
+            digest_size=16,
+        ).digest()
+        if key in summary_cache:
+            return {"summary": summary_cache[key]}
+
         # Generate summary using LLM
-        llm_response = generate_feedback_summary(all_feedback)
-        llm_response = json.loads(llm_response)
+        llm_response = (await generate_feedback_summary(all_feedback)).model_dump()
+        summary_cache[key] = llm_response
         return {"summary": llm_response}
 
     except GoogleAPICallError as e:
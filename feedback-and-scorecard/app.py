@@ -1,186 +1,167 @@
 # Importing necessary libraries and modules
-from fastapi import FastAPI, HTTPException, status
+from fastapi import BackgroundTasks, FastAPI, HTTPException, Request, status
 from fastapi.middleware.cors import CORSMiddleware
+from cors import cors_origins
+from fastapi.responses import ORJSONResponse
 from customer_agent import customer_graph
 from sales_agent import sales_graph
 import uvicorn
-import firebase_admin
-from firebase_admin import credentials, firestore
-import os
-import json
+import io
+from cachetools import TTLCache
+from contextlib import asynccontextmanager
 from datetime import datetime
+from typing import Any, Optional
+from pydantic import AliasChoices, BaseModel, Field
 from dotenv import load_dotenv
 
 # Load environment variables from a .env file
 load_dotenv()
 
-# Initialize Firebase app with credentials
-cred = credentials.Certificate(os.getenv("CRED_PATH"))
-firebase_admin.initialize_app(cred)
-db = firestore.client()  # Initialize Firestore client
+# Firestore client, initialized once in firebase_client
+from firebase_client import db
+
+# Make the compiled graphs and Firestore client available before any request is served
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.graphs = {"customer": customer_graph, "sales": sales_graph}
+    app.state.db = db
+    yield
 
 # Create FastAPI app instance
-app = FastAPI()
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 
-# Enable CORS for the app to allow requests from any origin
+# Enable CORS for the app's frontend origins
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],  # Allow requests from all origins
-    allow_credentials=True,
-    allow_methods=["*"],  # Allow all HTTP methods
+    **cors_origins(),  # Origins and credentials from CORS_ORIGINS
+    allow_methods=["GET", "POST", "PUT", "DELETE"],  # Only the methods the API serves
     allow_headers=["*"],  # Allow all HTTP headers
 )
 
-# Configuration settings for graph processing
-config = {
-    "thread_id": "main",  # Identifier for the thread
-    "checkpoint_ns": "my_namespace",  # Namespace for checkpoints
-    "checkpoint_id": "my_checkpoint",  # Unique identifier for checkpoint
+# Recently served scorecards keyed by room_id, so repeat requests skip Firestore
+feedback_cache = TTLCache(maxsize=10_000, ttl=60)
+
+# Scorecard sections; any metric the selected graph does not produce stays None
+class CommunicationAndDelivery(BaseModel):
+    empathy_score: Optional[str] = None
+    clarity_and_conciseness: Optional[str] = None
+    grammar_and_language: Optional[str] = None
+    listening_score: Optional[str] = None
+    positive_sentiment_score: Optional[str] = None
+    structure_and_flow: Optional[str] = None
+    stuttering_words: Optional[str] = None
+    active_listening_skills: Optional[str] = None
+
+class CustomerInteractionAndResolution(BaseModel):
+    problem_resolution_effectiveness: Optional[str] = None
+    personalisation_index: Optional[str] = None
+    conflict_management: Optional[str] = None
+    response_time: Optional[str] = None
+    # The customer graph reports this metric under its original misspelt name
+    customer_satisfaction_score: Optional[str] = Field(
+        None, validation_alias=AliasChoices("customer_satisfaction_score", "customer_satisfiction_score")
+    )
+    rapport_building: Optional[str] = None
+    engagement: Optional[str] = None
+
+class SalesAndPersuasion(BaseModel):
+    product_knowledge_score: Optional[str] = None
+    persuasion_and_negotiation_skills: Optional[str] = None
+    objection_handling: Optional[str] = None
+    upselling_success_rate: Optional[str] = None
+    call_to_action_effectiveness: Optional[str] = None
+    questioning_technique: Optional[str] = None
+
+class ProfessionalismAndPresentation(BaseModel):
+    confidence_score: Optional[str] = None
+    value_proposition: Optional[str] = None
+    pitch_quality: Optional[str] = None
+
+# Complete scorecard as stored in the 'feedback' collection
+class Scorecard(BaseModel):
+    communication_and_delivery: CommunicationAndDelivery = Field(default_factory=CommunicationAndDelivery)
+    customer_interaction_and_resolution: CustomerInteractionAndResolution = Field(default_factory=CustomerInteractionAndResolution)
+    sales_and_persuasion: SalesAndPersuasion = Field(default_factory=SalesAndPersuasion)
+    professionalism_and_presentation: ProfessionalismAndPresentation = Field(default_factory=ProfessionalismAndPresentation)
+    feedback: Any = None
+    duration: Optional[str] = None
+    user_id: Optional[str] = None
+    timestamp: datetime = Field(default_factory=datetime.utcnow)
+
+# Scorecard sections populated for each prompt type; the rest keep their None defaults
+SCORECARD_SECTIONS = {
+    "customer": {
+        "communication_and_delivery": CommunicationAndDelivery,
+        "customer_interaction_and_resolution": CustomerInteractionAndResolution,
+    },
+    "sales": {
+        "sales_and_persuasion": SalesAndPersuasion,
+        "professionalism_and_presentation": ProfessionalismAndPresentation,
+    },
 }
 
-# Global variable to store the compiled graph for customer interactions
-customer_compiled_graph = None
-
-# Function to retrieve and cache the compiled customer graph
-def get_customer_compiled_graph():
-    global customer_compiled_graph
-    if customer_compiled_graph is None:
-        customer_compiled_graph = customer_graph  # Load the graph if not already loaded
-    return customer_compiled_graph
-
-# Global variable to store the compiled graph for sales interactions
-sales_compiled_graph = None
-
-# Function to retrieve and cache the compiled sales graph
-def get_sales_compiled_graph():
-    global sales_compiled_graph
-    if sales_compiled_graph is None:
-        sales_compiled_graph = sales_graph  # Load the graph if not already loaded
-    return sales_compiled_graph
-
-# Function to generate a scorecard based on a transcription, prompt type, and other parameters
-def generate_scorecard(transcript, prompt_type, duration, user_id):
+# Function to generate a scorecard with the given graph based on a transcription, prompt type, and other parameters
+async def generate_scorecard(graph, transcript, prompt_type, duration, user_id):
     # Extract context and conversation from the transcription
     context = ""
-    conversation = []
+    conversation = io.StringIO()  # Written in place to avoid a string per turn plus a join
+    conversation_words = 0  # Lets the graph skip scoring conversations too short to judge
     for entry in transcript:
         if entry["role"] == "system":
             context = entry["content"]
         else:
-            conversation.append(f"{entry['role']}: {entry['content']}")
+            content = str(entry["content"])  # Tool-call turns carry None or a list rather than text
+            if conversation.tell():
+                conversation.write("\n")  # Separate turns without a trailing newline, like the old join
+            conversation.write(entry["role"])
+            conversation.write(": ")
+            conversation.write(content)
+            conversation_words += len(content.split())
 
     # Format the transcript for processing
-    formatted_transcript = f"Context:\n{context}\n\nConversation:\n" + "\n".join(conversation)
-
-    # Determine the appropriate graph to use based on the prompt type
-    if prompt_type == "customer":
-        graph = get_customer_compiled_graph()
-        result = graph.invoke({"transcript": formatted_transcript}, config=config)
-        result.pop("transcript")  # Remove transcript from results
-        result = {item.split(':', 1)[0].strip(): item.split(':', 1)[1].strip() for item in result['aggregate']}
-        
-        # Format the result into a structured scorecard
-        return {
-            "communication_and_delivery": {
-                "empathy_score": result["empathy_score"],
-                "clarity_and_conciseness": result["clarity_and_conciseness"],
-                "grammar_and_language": result["grammar_and_language"],
-                "listening_score": result["listening_score"],
-                "positive_sentiment_score": result["positive_sentiment_score"],
-                "structure_and_flow": result["structure_and_flow"],
-                "stuttering_words": result["stuttering_words"],   
-                "active_listening_skills": result["active_listening_skills"]
-            },
-            "customer_interaction_and_resolution": {
-                "problem_resolution_effectiveness": result["problem_resolution_effectiveness"],
-                "personalisation_index": result["personalisation_index"],
-                "conflict_management": result["conflict_management"],
-                "response_time": result["response_time"],
-                "customer_satisfaction_score": result["customer_satisfiction_score"],
-                "rapport_building": result["rapport_building"],
-                "engagement": result["engagement"]
-            },
-            "sales_and_persuasion": {
-                "product_knowledge_score": None,
-                "persuasion_and_negotiation_skills": None,
-                "objection_handling": None,
-                "upselling_success_rate": None,
-                "call_to_action_effectiveness": None,
-                "questioning_technique": None
-            },
-            "professionalism_and_presentation": {
-                "confidence_score": None,
-                "value_proposition": None,
-                "pitch_quality": None
-            },
-            "feedback": json.loads(result["feedback"]),
-            "duration": duration,
-            "user_id": user_id,
-            "timestamp": datetime.utcnow()
-        }
-    elif prompt_type == "sales":
-        graph = get_sales_compiled_graph()
-        result = graph.invoke({"transcript": formatted_transcript}, config=config)
-        result.pop("transcript")  # Remove transcript from results
-        result = {item.split(':', 1)[0].strip(): item.split(':', 1)[1].strip() for item in result['aggregate']}
-        
-        # Format the result into a structured scorecard
-        return {
-            "communication_and_delivery": {
-                "empathy_score": None,
-                "clarity_and_conciseness": None,
-                "grammar_and_language": None,
-                "listening_score": None,
-                "positive_sentiment_score": None,
-                "structure_and_flow": None,
-                "stuttering_words": None,
-                "active_listening_skills": None
-            },
-            "customer_interaction_and_resolution": {
-                "problem_resolution_effectiveness": None,
-                "personalisation_index": None,
-                "conflict_management": None,
-                "response_time": None,
-                "customer_satisfaction_score": None,
-                "rapport_building": None,
-                "engagement": None
-            },
-            "sales_and_persuasion": {
-                "product_knowledge_score": result["product_knowledge_score"],
-                "persuasion_and_negotiation_skills": result["persuasion_and_negotiation_skills"],
-                "objection_handling": result["objection_handling"],
-                "upselling_success_rate": result["upselling_success_rate"],
-                "call_to_action_effectiveness": result["call_to_action_effectiveness"],
-                "questioning_technique": result["questioning_technique"]
-            },
-            "professionalism_and_presentation": {
-                "confidence_score": result["confidence_score"],
-                "value_proposition": result["value_proposition"],
-                "pitch_quality": result["pitch_quality"]
-            },
-            "feedback": json.loads(result["feedback"]),
-            "duration": duration,
-            "user_id": user_id,
-            "timestamp": datetime.utcnow()
-        }
-    else:
+    conversation_text = conversation.getvalue()
+    formatted_transcript = f"Context:\n{context}\n\nConversation:\n{conversation_text}"
+
+    sections = SCORECARD_SECTIONS.get(prompt_type)
+    if sections is None:
         raise ValueError("Invalid type provided")
 
+    # Run the graph and fill in the sections for the prompt type from its scores
+    result = (await graph.ainvoke({
+        "transcript": formatted_transcript,
+        "conversation": conversation_text,
+        "conversation_words": conversation_words,
+    }))["aggregate"]  # Scores keyed by metric name
+    scorecard = Scorecard(
+        **{name: section.model_validate(result) for name, section in sections.items()},
+        feedback=result["feedback"],
+        duration=duration,
+        user_id=user_id,
+    )
+
+    return scorecard.model_dump()
+
 # API endpoint to retrieve or generate a scorecard for a transcription
 @app.post("/get_scorecard")
-async def get_transcription(room_id: str):
+async def get_transcription(room_id: str, request: Request, background_tasks: BackgroundTasks):
+    db = request.app.state.db
+    if room_id in feedback_cache:
+        return feedback_cache[room_id]
     try:
-        # Check if feedback already exists in the 'feedback' collection
+        # Fetch the existing feedback and the transcription in a single batched read
         feedback_doc_ref = db.collection(u'feedback').document(room_id)
-        feedback_doc = feedback_doc_ref.get()
+        doc_ref = db.collection(u'Transcription').document(room_id)
+        snapshots = {snap.reference.path: snap async for snap in db.get_all([feedback_doc_ref, doc_ref])}  # get_all does not preserve order
+        feedback_doc = snapshots[feedback_doc_ref.path]
         
         if feedback_doc.exists:
             # Return existing feedback
-            return feedback_doc.to_dict()
+            feedback = feedback_doc.to_dict()
+            feedback_cache[room_id] = feedback
+            return feedback
         else:
-            # Retrieve transcription document from Firestore
-            doc_ref = db.collection(u'Transcription').document(room_id)
-            doc = doc_ref.get()
+            # Use the transcription document fetched alongside it
+            doc = snapshots[doc_ref.path]
 
             if doc.exists:
                 doc_data = doc.to_dict()
@@ -190,12 +171,15 @@ async def get_transcription(room_id: str):
                 user_id = doc_data.get("user_id", None)  # Default to None if not present
 
                 # Validate the prompt type
-                if prompt_type in ["customer", "sales"]:
+                if prompt_type in SCORECARD_SECTIONS:
                     # Generate feedback scorecard
-                    feedback = generate_scorecard(transcript, prompt_type, duration, user_id)
+                    graph = request.app.state.graphs[prompt_type]
+                    feedback = await generate_scorecard(graph, transcript, prompt_type, duration, user_id)
                     
-                    # Store feedback in Firestore 'feedback' collection
-                    feedback_doc_ref.set(feedback)
+                    # Store feedback in Firestore 'feedback' collection once the response is sent;
+                    # the cache serves repeat requests until the write lands
+                    feedback_cache[room_id] = feedback
+                    background_tasks.add_task(feedback_doc_ref.set, feedback)
                     
                     # Return the generated feedback
                     return feedback
@@ -0,0 +1,56 @@
+# Builds the FAISS index over the knowledge document once, ahead of deployment, so the
+# agents load it from disk instead of re-embedding the document in every worker at startup.
+# Run `python build_index.py` before building the Docker image; the index directory is copied with the source.
+from langchain_community.embeddings import FastEmbedEmbeddings
+from langchain_community.vectorstores import FAISS
+from langchain.text_splitter import CharacterTextSplitter
+from langchain.docstore.document import Document
+import zipfile
+from lxml import etree
+import os
+from dotenv import load_dotenv
+
+# Load environment variables from a .env file
+load_dotenv()
+
+# Directory the index is saved to and loaded from
+INDEX_PATH = "faiss_index"
+
+# Directory the embedding model is read from; the Docker image fetches the model into it at
+# build time, so workers load it from disk instead of downloading it when they start
+EMBEDDING_CACHE_DIR = os.getenv("FASTEMBED_CACHE_PATH", "fastembed_cache")
+
+# Initialize embeddings for vectorstore (FAISS) with a small local ONNX model, so embedding the
+# query at request time needs no network call; rebuild the index whenever this model changes
+# (and update the model fetched in the Dockerfile to match)
+embeddings = FastEmbedEmbeddings(
+    model_name="sentence-transformers/all-MiniLM-L6-v2", cache_dir=EMBEDDING_CACHE_DIR
+)
+
+# WordprocessingML namespace used in word/document.xml
+W_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+# Function to extract text from a .docx file, reading the paragraph XML directly
+def extract_text_from_docx(file_path):
+    with zipfile.ZipFile(file_path) as archive, archive.open("word/document.xml") as document:
+        tree = etree.parse(document)
+    # One line per paragraph, joining the text runs inside it
+    return "\n".join(
+        "".join(text.text or "" for text in paragraph.iter(f"{W_NS}t"))
+        for paragraph in tree.iter(f"{W_NS}p")
+    )
+
+# Function to embed the document's text chunks into a new FAISS index
+def build_vectorstore(file_path="book_summary.docx"):
+    # Load and split documents into chunks
+    documents = [Document(page_content=extract_text_from_docx(file_path))]  # Add more documents as necessary
+    text_splitter = CharacterTextSplitter(chunk_size=1000, chunk_overlap=0)
+    texts = text_splitter.split_documents(documents)
+    return FAISS.from_documents(texts, embeddings)
+
+# Function to load the prebuilt index; it is our own file, so deserializing it is safe
+def load_vectorstore():
+    return FAISS.load_local(INDEX_PATH, embeddings, allow_dangerous_deserialization=True)
+
+if __name__ == "__main__":
+    build_vectorstore().save_local(INDEX_PATH)
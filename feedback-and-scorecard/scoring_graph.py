@@ -0,0 +1,91 @@
+# Shared LangGraph scaffolding for the scoring agents: each agent supplies its metric names and LLM,
+# and build_graph wires one node per metric plus the knowledge-backed feedback node
+import hashlib
+from cachetools import LRUCache
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.output_parsers import JsonOutputParser, StrOutputParser
+from langgraph.graph import StateGraph, END, START
+from typing_extensions import TypedDict
+from typing import Annotated, Any
+from operator import or_
+import prompts
+from build_index import load_vectorstore
+
+# Load the FAISS index built ahead of time by build_index.py; shared by every agent
+vectorstore = load_vectorstore()
+
+# Retrieved knowledge keyed by a digest of the conversation, so re-processed rooms skip the
+# embedding call and the FAISS search
+retrieval_cache = LRUCache(maxsize=2048)
+
+# The query is the conversation alone: the embedding model only reads its first 512 tokens,
+# which the multi-KB scenario prompt in the transcript's context would otherwise fill
+async def retrieve_knowledge(conversation):
+    key = hashlib.blake2b(conversation.encode(), digest_size=16).digest()
+    if key not in retrieval_cache:
+        relevant_docs = await vectorstore.asimilarity_search(conversation, k=5) # Retrieve top 5 similar documents
+        retrieval_cache[key] = "\n".join([doc.page_content for doc in relevant_docs]) # Format them as a string
+    return retrieval_cache[key]
+
+# Define a custom TypedDict to structure the state of the graph
+class GraphState(TypedDict):
+    transcript: str  # Transcript text input, immutable
+    conversation: str  # Just the conversation turns, used as the knowledge retrieval query
+    conversation_words: int  # Words spoken in the conversation, counted when the transcript is formatted
+    aggregate: Annotated[dict[str, Any], or_]  # Metric scores (and parsed feedback) from parallel nodes, merged by name
+
+# Conversations with fewer words than this give the metric prompts nothing to score
+MIN_CONVERSATION_WORDS = 50
+
+# Build the compiled graph for one agent; each metric name needs a matching <name>_prompt builder in prompts.py
+def build_graph(metric_names, llm):
+    # Build each prompt chain once; the transcript (and retrieved knowledge)
+    # are filled into the template variables on every call
+    chains = {
+        name: ChatPromptTemplate.from_template(getattr(prompts, f"{name}_prompt")("{transcript}")) | llm | StrOutputParser()
+        for name in metric_names
+    }
+    feedback_chain = (
+        ChatPromptTemplate.from_template(prompts.feedback_prompt("{transcript}") + "\nRetrieved Knowledge: {retrieved_docs}")
+        | llm
+        | JsonOutputParser()  # The feedback prompt asks for JSON, so parse it in the chain
+    )
+
+    # Build the node for one metric: it runs the metric's chain and reports the score under its name
+    def make_node(name):
+        async def node(state):
+            score = await chains[name].ainvoke({"transcript": state["transcript"]})
+            return {"aggregate": {name: score.strip()}}
+        return node
+
+    async def feedback(state):
+        transcript = state["transcript"]
+        retrieved_docs = await retrieve_knowledge(state["conversation"])
+        feedback_result = await feedback_chain.ainvoke({"transcript": transcript, "retrieved_docs": retrieved_docs}) # Generate feedback
+        return {"aggregate": {"feedback": feedback_result}} # Return feedback result
+
+    # Define the state graph workflow
+    workflow = StateGraph(GraphState)
+
+    # Add each metric node to the graph
+    for name in metric_names:
+        workflow.add_node(f"node_{name}", make_node(name))
+    workflow.add_node("node_feedback", feedback)
+
+    # Nodes fanned out in parallel from START
+    metric_nodes = [f"node_{name}" for name in metric_names] + ["node_feedback"]
+
+    # Route from START: conversations too short to score only get feedback, the rest run every metric
+    def route_transcript(state):
+        if state["conversation_words"] < MIN_CONVERSATION_WORDS:
+            return ["node_feedback"]
+        return metric_nodes
+
+    workflow.add_conditional_edges(START, route_transcript, metric_nodes)
+
+    # Each node ends on its own, so the graph also finishes when only some of them ran
+    for node in metric_nodes:
+        workflow.add_edge(node, END)
+
+    # Compile the graph for execution; each scorecard run is independent, so no checkpointer is needed
+    return workflow.compile()
@@ -1,41 +1,75 @@
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
-import firebase_admin
-from firebase_admin import credentials, firestore, initialize_app
-from typing import List
+from cors import cors_origins
+from fastapi.responses import ORJSONResponse
+from firebase_admin import firestore
+from typing import List, Optional
+from datetime import datetime
 from pydantic import BaseModel
-import os
+from cachetools import TTLCache
 from dotenv import load_dotenv
 load_dotenv()
 
-app = FastAPI()
+app = FastAPI(default_response_class=ORJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
+    **cors_origins(),  # Origins and credentials from CORS_ORIGINS
+    allow_methods=["GET", "POST", "PUT", "DELETE"],
     allow_headers=["*"],
 )
 
-# Initialize Firebase
+# Firebase is initialized once in firebase_client
+from firebase_client import db
 
-cred = credentials.Certificate(os.getenv("CRED_PATH"))
-firebase_admin.initialize_app(cred)
-db = firestore.client()
+# Feedback pages keyed by (user_id, limit, cursor, cursor_id), so repeat requests within a minute skip Firestore
+feedback_cache = TTLCache(maxsize=10_000, ttl=60)
 
+# Returns the user's feedback newest first, one page at a time; pass the last item's
+# timestamp as `cursor` and its `id` as `cursor_id` to fetch the next page. Feedback
+# sharing a timestamp is ordered by document ID, so the ID keeps ties from being skipped
 @app.get("/feedback/{user_id}")
-async def get_feedback(user_id: str):
+async def get_feedback(
+    user_id: str,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+    cursor_id: Optional[str] = None,
+):
+    key = (user_id, limit, cursor, cursor_id)
+    if key in feedback_cache:
+        return feedback_cache[key]
     try:
-        feedbacks = db.collection('feedback').where('user_id', '==', user_id).stream()
-        feedback_list = [doc.to_dict() for doc in feedbacks]
+        start_after = datetime.fromisoformat(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="cursor must be an ISO 8601 timestamp")
+    try:
+        # Served by the (user_id, timestamp DESC) composite index declared in dashboard/firestore.indexes.json,
+        # which implicitly ends with __name__ in the same direction
+        feedback_ref = db.collection('feedback')
+        query = (
+            feedback_ref
+            .where('user_id', '==', user_id)
+            .order_by('timestamp', direction=firestore.Query.DESCENDING)
+            .order_by('__name__', direction=firestore.Query.DESCENDING)
+            .limit(limit)
+        )
+        if start_after:
+            position = {'timestamp': start_after}
+            if cursor_id:
+                position['__name__'] = feedback_ref.document(cursor_id)
+            query = query.start_after(position)
+        feedback_list = [{**doc.to_dict(), "id": doc.id} async for doc in query.stream()]
         
-        if not feedback_list:
+        # An empty page past the end of the list is normal; only a user with no feedback at all is a 404
+        if not feedback_list and not cursor:
             raise HTTPException(status_code=404, detail="No feedback found")
             
+        feedback_cache[key] = feedback_list
         return feedback_list
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -1,16 +1,14 @@
 import os
-import re
 import sys
-import json
+import orjson
 import base64
 import wave
+import numpy as np
 import argparse
 import asyncio
 from datetime import datetime
 from typing import Dict
 from urllib.parse import urlparse
-import firebase_admin
-from firebase_admin import firestore, credentials
 from dotenv import load_dotenv
 from loguru import logger
 from pipecat.audio.vad.silero import SileroVADAnalyzer
@@ -33,32 +31,63 @@ load_dotenv(override=True)
 logger.remove(0)
 logger.add(sys.stderr, level="DEBUG")
 
-# Firebase initialization
+# Firebase is initialized lazily in firebase_client, when the transcript is first saved
+from firebase_client import get_db
+
 FILES_DIR = "saved_files"
-cred = credentials.Certificate(os.getenv("CRED_PATH"))
-firebase_admin.initialize_app(cred)
-db = firestore.client()
+os.makedirs(FILES_DIR, exist_ok=True)
+
+# Daily transcription settings are the same for every call
+TRANSCRIPTION_SETTINGS = DailyTranscriptionSettings(language="en", tier="nova", model="2-general")
 
 # Variable to store the start time
 start_time = None
 
 # Save transcription data to Firebase
 async def save_in_db(room_id: str, transcript: str,prompt_type:str, user_id:str, duration: str):
-    doc_ref = db.collection("Transcription").document(room_id)
+    doc_ref = get_db().collection("Transcription").document(room_id)
     data = {"transcript": transcript, "type": prompt_type, "user_id": user_id, "timestamp": datetime.utcnow(), "call_duration": duration}
-    doc_ref.set(data)
+    await asyncio.to_thread(doc_ref.set, data)  # Sync client, so keep the RPC off the event loop
     logger.info(f"Transcription saved successfully for room: {room_id}")
 
-# Save audio buffer as a WAV file
-async def save_audio(audiobuffer, room_url: str):
+# Number of stereo frames interleaved and written per step when saving audio
+AUDIO_CHUNK_FRAMES = 16_000
+
+# Write two mono 16-bit tracks (user left, bot right) as a stereo WAV one chunk at a time,
+# so only a chunk of interleaved audio is held in memory instead of a copy of the whole call
+def write_stereo_wav(filename: str, left: bytearray, right: bytearray, sample_rate: int):
+    frames = max(len(left), len(right)) // 2
+    stereo = np.zeros((AUDIO_CHUNK_FRAMES, 2), dtype=np.int16)  # Reused for every chunk
+    with wave.open(filename, "wb") as wf:
+        wf.setnchannels(2)
+        wf.setsampwidth(2)
+        wf.setframerate(sample_rate)
+        for start in range(0, frames, AUDIO_CHUNK_FRAMES):
+            count = min(AUDIO_CHUNK_FRAMES, frames - start)
+            chunk = stereo[:count]
+            chunk.fill(0)  # Silence where one track is shorter than the other
+            for channel, track in enumerate((left, right)):
+                samples = np.frombuffer(track[start * 2:(start + count) * 2], dtype=np.int16)
+                chunk[:len(samples), channel] = samples
+            wf.writeframes(chunk.tobytes())
+
+# Fall back to pipecat's in-memory merge if its buffer internals change
+def write_merged_wav(filename: str, audiobuffer):
+    merged_audio = audiobuffer.merge_audio_buffers()
+    with wave.open(filename, "wb") as wf:
+        wf.setnchannels(2)
+        wf.setsampwidth(2)
+        wf.setframerate(audiobuffer._sample_rate)
+        wf.writeframes(merged_audio)
+
+# Save audio buffer as a WAV file; the write runs in a worker thread so the
+# pipeline keeps processing frames while a long call is written out
+async def save_audio(audiobuffer, filename: str):
     if audiobuffer.has_audio():
-        merged_audio = audiobuffer.merge_audio_buffers()
-        filename = os.path.join(FILES_DIR, f"audio_{(urlparse(room_url).path).removeprefix('/')}.wav")
-        with wave.open(filename, "wb") as wf:
-            wf.setnchannels(2)
-            wf.setsampwidth(2)
-            wf.setframerate(audiobuffer._sample_rate)
-            wf.writeframes(merged_audio)
+        if hasattr(audiobuffer, "_user_audio_buffer") and hasattr(audiobuffer, "_assistant_audio_buffer"):
+            await asyncio.to_thread(write_stereo_wav, filename, audiobuffer._user_audio_buffer, audiobuffer._assistant_audio_buffer, audiobuffer._sample_rate)
+        else:
+            await asyncio.to_thread(write_merged_wav, filename, audiobuffer)
         logger.info(f"Merged audio saved to {filename}")
     else:
         logger.warning("No audio data to save")
@@ -67,8 +96,11 @@ async def save_audio(audiobuffer, room_url: str):
 # Main execution function
 async def main(room_url: str, token: str, config_b64: str):
     # Decode the configuration
-    config_str = base64.b64decode(config_b64).decode()
-    config = json.loads(config_str)
+    config = orjson.loads(base64.b64decode(config_b64))
+
+    # The room name identifies both the saved audio and the transcript
+    room_id = urlparse(room_url).path.removeprefix('/')
+    audio_filename = os.path.join(FILES_DIR, f"audio_{room_id}.wav")
 
     # Initialize Daily transport
     transport = DailyTransport(
@@ -83,7 +115,7 @@ async def main(room_url: str, token: str, config_b64: str):
             vad_audio_passthrough=True,
             vad_analyzer=SileroVADAnalyzer(),
             transcription_enabled=True,
-            transcription_settings=DailyTranscriptionSettings(language="en", tier="nova", model="2-general")
+            transcription_settings=TRANSCRIPTION_SETTINGS
         ),
     )
 
@@ -103,11 +135,12 @@ async def main(room_url: str, token: str, config_b64: str):
     )
     llm = OpenAILLMService(api_key=os.getenv("OPENAI_API_KEY"), model="gpt-4o")
 
-    # Initial messages for the chatbot
-    messages = [{"role": "system", "content": config['prompt']}]
+    # System prompt for the chatbot. It is the fixed prefix of every LLM request and turns are only
+    # appended after it, which lets OpenAI's prompt caching reuse it
+    system_message = {"role": "system", "content": config['prompt']}
 
     # Initialize context and pipeline components
-    context = OpenAILLMContext(messages)
+    context = OpenAILLMContext([system_message])
     context_aggregator = llm.create_context_aggregator(context)
     audiobuffer = AudioBufferProcessor()
 
@@ -133,7 +166,8 @@ async def main(room_url: str, token: str, config_b64: str):
         global start_time
         start_time = datetime.utcnow()  # Record the start time
         await transport.capture_participant_transcription(participant["id"])
-        await task.queue_frames([LLMMessagesFrame(messages)])
+        # pipecat annotates the messages in this frame in place, so give it a copy
+        await task.queue_frames([LLMMessagesFrame([dict(system_message)])])
         logger.info(f"First participant joined: {participant['id']}")
 
     # Event handler when participant leaves
@@ -152,8 +186,8 @@ async def main(room_url: str, token: str, config_b64: str):
             duration_str = "Unknown"  # Handle cases where start time wasn't recorded
 
         # Save audio and transcription data, then end the pipeline task
-        await save_audio(audiobuffer, room_url)
-        await save_in_db(room_id=(urlparse(room_url).path).removeprefix('/'),transcript= context.get_messages(),prompt_type = roleplay_type, user_id=user_id, duration=duration_str)
+        await save_audio(audiobuffer, audio_filename)
+        await save_in_db(room_id=room_id,transcript= context.get_messages(),prompt_type = roleplay_type, user_id=user_id, duration=duration_str)
         await task.queue_frame(EndFrame())
 
     # Run the pipeline task
@@ -0,0 +1,9 @@
+# Firebase is initialized on first use, once per process, however many modules import it
+import os
+import firebase_admin
+from firebase_admin import credentials, firestore
+
+def get_db():
+    if not firebase_admin._apps:
+        firebase_admin.initialize_app(credentials.Certificate(os.getenv("CRED_PATH")))
+    return firestore.client()  # firebase_admin hands back the same client on every call
@@ -1,38 +1,79 @@
 from fastapi import FastAPI, HTTPException, status
 from fastapi.middleware.cors import CORSMiddleware
+from cors import cors_origins
+from fastapi.responses import ORJSONResponse
+import asyncio
 import uuid
-import firebase_admin
-from firebase_admin import firestore, credentials
 import os
 import uvicorn
 import random
+from cachetools import TTLCache
+from pydantic import BaseModel, ConfigDict, Field
+from typing import List
 from dotenv import load_dotenv
 
 # Load environment variables from a .env file
 load_dotenv()
 
-# Initialize Firebase using credentials stored in the environment variable
-cred = credentials.Certificate(os.getenv("CRED_PATH"))
-firebase_admin.initialize_app(cred)
+# Firebase is initialized once in firebase_client
+from firebase_client import db
+SCENARIOS = db.collection("scenarios")  # Shared reference to the scenarios collection
 
-# Create a Firestore client to interact with Firebase Firestore database
-db = firestore.client()
+# Scenarios grouped by type and the list of all scenario IDs change rarely, so they are cached
+# briefly and cleared whenever a scenario is created, updated or deleted. Each worker process
+# keeps its own caches, so workers other than the one handling a write can serve stale data
+# for up to the 60s TTL
+scenarios_by_type = TTLCache(maxsize=64, ttl=60)
+scenario_ids_cache = TTLCache(maxsize=1, ttl=60)
+
+# One lock per roleplay type being refilled, so concurrent misses for a type run a single
+# Firestore query; a lock is dropped once its refill finishes and waiters re-check the cache
+refill_locks = {}
+
+# Bumped on every invalidation, so a refill whose query overlapped a write doesn't cache
+# the pre-write results
+cache_generation = 0
+
+def invalidate_scenario_cache():
+    global cache_generation
+    cache_generation += 1
+    scenarios_by_type.clear()
+    scenario_ids_cache.clear()
+
+# Scenario field holding the prompt for each difficulty level
+PROMPT_KEYS = {"easy": "easy_prompt", "medium": "medium_prompt", "hard": "hard_prompt"}
+
+# Scenario fields returned as-is by get_scenario
+SCENARIO_FIELDS = ("name", "persona_name", "persona", "image_url", "voice_id", "type")
+
+# Firestore accepts at most 500 writes in a single batch commit
+MAX_BATCH_WRITES = 500
+
+# Scenario details accepted in create and update request bodies;
+# the AI persona is sent as AI_persona but stored as persona
+class ScenarioIn(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    name: str
+    prompt: str
+    type: str
+    persona: str = Field(alias="AI_persona")
 
 # Initialize FastAPI application
-app = FastAPI()
+app = FastAPI(default_response_class=ORJSONResponse)
 
 # Add middleware for Cross-Origin Resource Sharing (CORS)
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],  # Allow all origins (you may restrict this later for security)
-    allow_credentials=True,
-    allow_methods=["*"],  # Allow all HTTP methods (GET, POST, etc.)
-    allow_headers=["*"],  # Allow all headers
+    **cors_origins(),  # Origins and credentials from CORS_ORIGINS
+    allow_methods=["GET", "POST", "PUT", "DELETE"],  # Only the methods the API serves
+    allow_headers=["Authorization", "Content-Type"],
+    max_age=86400,  # Let browsers reuse a preflight response for a day
 )
 
 # Endpoint to create a new scenario
 @app.post("/scenarios", status_code=status.HTTP_201_CREATED)
-async def create_scenario(name: str, prompt: str, type: str, AI_persona: str):
+async def create_scenario(scenario: ScenarioIn):
     """
     This endpoint creates a new scenario with the provided details. 
     It generates a unique ID for the scenario and stores it in Firestore.
@@ -40,13 +81,9 @@ async def create_scenario(name: str, prompt: str, type: str, AI_persona: str):
     id = str(uuid.uuid4())  # Generate a unique ID for the new scenario
     try:
         # Reference the "scenarios" collection in Firestore and create a new document
-        doc_ref = db.collection(u'scenarios').document(id)
-        doc_ref.set({
-            u'name': name,
-            u'prompt': prompt,
-            u'type': type,
-            u'persona': AI_persona
-        })
+        doc_ref = SCENARIOS.document(id)
+        await doc_ref.set(scenario.model_dump())
+        invalidate_scenario_cache()
         return {"message": f"Scenario created successfully", "id": id}
     except Exception as e:
         # If an error occurs during the creation process, raise an HTTP 500 error
@@ -55,6 +92,31 @@ async def create_scenario(name: str, prompt: str, type: str, AI_persona: str):
             detail=f"Failed to create scenario: {str(e)}"
         )
 
+# Endpoint to create several scenarios at once
+@app.post("/scenarios/batch", status_code=status.HTTP_201_CREATED)
+async def create_scenarios(scenarios: List[ScenarioIn]):
+    """
+    This endpoint creates all the given scenarios, committing them to Firestore in
+    batched writes rather than one request per scenario. It returns the generated IDs
+    in the same order as the input.
+    """
+    ids = [str(uuid.uuid4()) for _ in scenarios]
+    try:
+        for start in range(0, len(scenarios), MAX_BATCH_WRITES):
+            batch = db.batch()
+            for id, scenario in zip(ids[start:start + MAX_BATCH_WRITES], scenarios[start:start + MAX_BATCH_WRITES]):
+                batch.set(SCENARIOS.document(id), scenario.model_dump())
+            await batch.commit()
+        invalidate_scenario_cache()
+        return {"message": "Scenarios created successfully", "ids": ids}
+    except Exception as e:
+        # Batches committed before the failure are kept, so drop any cached lookups
+        invalidate_scenario_cache()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to create scenarios: {str(e)}"
+        )
+
 # Endpoint to get a specific scenario based on roleplay type and difficulty level
 @app.get("/scenarios/{scenario_id}")
 async def get_scenario(roleplay_type: str, difficulty_level: str):
@@ -62,83 +124,60 @@ async def get_scenario(roleplay_type: str, difficulty_level: str):
     This endpoint retrieves a scenario from Firestore based on the specified roleplay type
     and difficulty level. It randomly selects one scenario if there are multiple matching.
     """
-    # Query Firestore for scenarios that match the specified roleplay type
-    scenarios_ref = db.collection(u'scenarios')
-    query = scenarios_ref.where("type", "==", roleplay_type)
-    docs = query.stream()
-    
-    # Collect all scenario IDs that match the type (e.g., "sales")
-    sales_scenarios = []
-    for doc in docs:
-        sales_scenarios.append(doc.id)
+    prompt_key = PROMPT_KEYS.get(difficulty_level)
+    if prompt_key is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="difficulty_level must be one of: easy, medium, hard"
+        )
+
+    scenarios = scenarios_by_type.get(roleplay_type)
+    if scenarios is None:
+        async with refill_locks.setdefault(roleplay_type, asyncio.Lock()):
+            scenarios = scenarios_by_type.get(roleplay_type)
+            if scenarios is None:
+                try:
+                    # Query Firestore for scenarios that match the specified roleplay type (e.g., "sales")
+                    generation = cache_generation
+                    query = SCENARIOS.where("type", "==", roleplay_type)
+                    scenarios = [doc.to_dict() async for doc in query.stream()]
+                    if generation == cache_generation:
+                        scenarios_by_type[roleplay_type] = scenarios
+                finally:
+                    refill_locks.pop(roleplay_type, None)
+    if not scenarios:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No scenarios found for this roleplay type"
+        )
 
     # Randomly select a scenario from the matching ones
-    selected_scenario = random.choice(sales_scenarios)
-
-    # Retrieve the selected scenario's document from Firestore
-    doc_ref = db.collection(u'scenarios').document(selected_scenario)
-    doc = doc_ref.get()
-    
-    if doc.exists:
-        scenario = doc.to_dict()
-        
-        # Return the scenario details based on the difficulty level
-        if difficulty_level == "easy":
-            return {
-                "name": scenario.get('name', ''),
-                "prompt": scenario.get("easy_prompt", ""),
-                "persona_name": scenario.get('persona_name', ''),
-                "persona": scenario.get('persona', ''),
-                "difficulty_level": difficulty_level,
-                "image_url": scenario.get('image_url', ''),
-                "voice_id": scenario.get('voice_id', ''),
-                "type": scenario.get('type', '')
-            }
-        elif difficulty_level == "medium":
-            return {
-                "name": scenario.get('name', ''),
-                "prompt": scenario.get("medium_prompt", ""),
-                "persona_name": scenario.get('persona_name', ''),
-                "persona": scenario.get('persona', ''),
-                "difficulty_level": difficulty_level,
-                "image_url": scenario.get('image_url', ''),
-                "voice_id": scenario.get('voice_id', ''),
-                "type": scenario.get('type', '')
-            }
-        elif difficulty_level == "hard":
-            return {
-                "name": scenario.get('name', ''),
-                "prompt": scenario.get("hard_prompt", ""),
-                "persona_name": scenario.get('persona_name', ''),
-                "persona": scenario.get('persona', ''),
-                "difficulty_level": difficulty_level,
-                "image_url": scenario.get('image_url', ''),
-                "voice_id": scenario.get('voice_id', ''),
-                "type": scenario.get('type', '')
-            }
+    scenario = random.choice(scenarios)
+
+    # Return the scenario details with the prompt for the requested difficulty level
+    response = {field: scenario.get(field, '') for field in SCENARIO_FIELDS}
+    response["prompt"] = scenario.get(prompt_key, "")
+    response["difficulty_level"] = difficulty_level
+    return response
 
 # Endpoint to update an existing scenario based on scenario ID
 @app.put("/scenarios/{scenario_id}")
-async def update_scenario(scenario_id: str, name: str, prompt: str, type: str, AI_persona: str):
+async def update_scenario(scenario_id: str, scenario: ScenarioIn):
     """
     This endpoint allows updating an existing scenario's details using the scenario ID.
     It verifies the scenario exists before updating.
     """
     try:
-        doc_ref = db.collection(u'scenarios').document(scenario_id)
-        doc = doc_ref.get()
+        doc_ref = SCENARIOS.document(scenario_id)
+        doc = await doc_ref.get()
         if not doc.exists:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Scenario not found"
             )
         # Update the scenario with the new values
-        doc_ref.update({
-            u'name': name,
-            u'prompt': prompt,
-            u'type': type,
-            u'persona': AI_persona
-        })
+        await doc_ref.update(scenario.model_dump())
+        invalidate_scenario_cache()
         return {"message": "Scenario updated successfully"}
     except HTTPException:
         raise
@@ -157,15 +196,16 @@ async def delete_scenario(scenario_id: str):
     It checks if the scenario exists before attempting to delete.
     """
     try:
-        doc_ref = db.collection(u'scenarios').document(scenario_id)
-        doc = doc_ref.get()
+        doc_ref = SCENARIOS.document(scenario_id)
+        doc = await doc_ref.get()
         if not doc.exists:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Scenario not found"
             )
         # Delete the scenario document from Firestore
-        doc_ref.delete()
+        await doc_ref.delete()
+        invalidate_scenario_cache()
         return {"message": "Scenario deleted successfully"}
     except HTTPException:
         raise
@@ -184,10 +224,13 @@ async def get_all_scenario_ids():
     It returns an empty message if no scenarios are found.
     """
     try:
-        docs = db.collection(u'scenarios').stream()
-        
-        # Collect all the scenario IDs
-        scenario_ids = [doc.id for doc in docs]
+        scenario_ids = scenario_ids_cache.get("all")
+        if scenario_ids is None:
+            generation = cache_generation
+            # Collect all the scenario IDs; the empty projection returns document names only
+            scenario_ids = [doc.id async for doc in SCENARIOS.select([]).stream()]
+            if generation == cache_generation:
+                scenario_ids_cache["all"] = scenario_ids
         
         if scenario_ids:
             return {"scenario_ids": scenario_ids}
@@ -202,5 +245,17 @@ async def get_all_scenario_ids():
         )
 
 # Start the FastAPI application using Uvicorn server
+# (auto-reload only when DEV is set; it cannot be combined with multiple workers)
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000, reload=True)
+    if os.getenv("DEV"):
+        uvicorn.run("app:app", host="0.0.0.0", port=8000, reload=True)
+    else:
+        uvicorn.run(
+            "app:app",
+            host="0.0.0.0",
+            port=8000,
+            workers=int(os.getenv("WEB_CONCURRENCY", "4")),
+            loop="uvloop",
+            http="httptools",
+            access_log=False,
+        )
@@ -0,0 +1,9 @@
+# Firebase is initialized here once per process, however many modules import it
+import os
+import firebase_admin
+from firebase_admin import credentials, firestore_async
+
+if not firebase_admin._apps:
+    firebase_admin.initialize_app(credentials.Certificate(os.getenv("CRED_PATH")))
+
+db = firestore_async.client()  # Async client so Firestore RPCs don't block the event loop